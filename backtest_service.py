@@ -1,76 +1,138 @@
 """Backtesting service using Lumibot"""
 from lumibot.backtesting import YahooDataBacktesting
 from strategy import GapTradingStrategy
+from config import settings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, List
+import asyncio
 import logging
+import multiprocessing
+import sys
 
 logger = logging.getLogger(__name__)
 
 
+def _init_worker_logging(level: str):
+    """Log straight to stdout in worker processes
+    
+    The API's queue listener thread lives in the parent, so records from
+    a worker would otherwise have no handler and be dropped.
+    """
+    logging.basicConfig(
+        level=getattr(logging, level.upper()),
+        stream=sys.stdout,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+
+
+def _new_backtest_pool() -> ProcessPoolExecutor:
+    """Worker pool for backtests"""
+    # Workers are spawned rather than forked (the API process already runs
+    # threads) and capped by settings, since the host CPU count says nothing
+    # about the container's memory budget
+    return ProcessPoolExecutor(
+        max_workers=settings.backtest_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker_logging,
+        initargs=(settings.log_level,),
+    )
+
+
+# Lumibot backtests are blocking and CPU-bound; run them off the event loop.
+# Replaced by _execute_backtest if a worker dies and breaks the pool
+_backtest_pool = _new_backtest_pool()
+
+# Bound in-flight submissions to the worker count so fan-outs don't queue up
+_backtest_sem = asyncio.Semaphore(settings.backtest_workers)
+
+# Backtests currently running: cache key -> task, so identical concurrent
+# requests join one worker run instead of each starting their own
+_BACKTEST_INFLIGHT: Dict[tuple, asyncio.Task] = {}
+
+# Daily-resolution backtests are deterministic for a given date range,
+# so results are kept for the rest of the day: (symbols, start, end) -> result
+_BACKTEST_CACHE: Dict[tuple, Dict] = {}
+
+
+def _sync_backtest(symbols: List[str], start_date: datetime, end_date: datetime):
+    """Run the Lumibot backtest synchronously (executed in a worker process)"""
+    # Create strategy instance for backtesting
+    GapTradingStrategy.parameters["scan_symbols"] = list(symbols)
+    
+    # Run backtest using Yahoo data (free)
+    return GapTradingStrategy.backtest(
+        YahooDataBacktesting,
+        start_date,
+        end_date,
+        parameters={
+            "scan_symbols": list(symbols),
+        },
+    )
+
+
+def shutdown_backtest_pool():
+    """Stop backtest worker processes"""
+    _backtest_pool.shutdown(wait=False, cancel_futures=True)
+    logger.info("Backtest pool shut down")
+
+
 async def run_backtest(symbol: str, days: int = 90) -> Dict:
+    """Run backtest for gap strategy on a single symbol"""
+    return await run_backtest_batch([symbol], days)
+
+
+async def run_backtests(symbols: List[str], days: int = 90) -> List[Dict]:
+    """
+    Run independent backtests for each symbol in parallel
+    
+    Each symbol gets its own worker process, so results are per-symbol
+    rather than portfolio-level like run_backtest_batch.
     """
-    Run backtest for gap strategy on a symbol
+    return await asyncio.gather(*(run_backtest(symbol, days) for symbol in symbols))
+
+
+async def run_backtest_batch(symbols: List[str], days: int = 90) -> Dict:
+    """
+    Run backtest for gap strategy on a basket of symbols
+    
+    All symbols share one Lumibot engine run, so the Yahoo data download
+    and strategy setup happen once instead of once per symbol. Lumibot
+    reports portfolio-level statistics, so the result covers the basket.
     
     Note: This is a simplified backtest. In production, you'd want
     more sophisticated backtesting with proper data sources.
     """
+    label = ",".join(symbols)
+    
+    # Calculate date range
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    
     try:
-        # Calculate date range
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        # Create strategy instance for backtesting
-        GapTradingStrategy.parameters["scan_symbols"] = [symbol]
-        
-        # Run backtest using Yahoo data (free)
-        results = GapTradingStrategy.backtest(
-            YahooDataBacktesting,
-            start_date,
-            end_date,
-            parameters={
-                "scan_symbols": [symbol],
-            },
-        )
+        cache_key = (tuple(symbols), start_date.date(), end_date.date())
+        if cache_key in _BACKTEST_CACHE:
+            return _BACKTEST_CACHE[cache_key]
         
-        # Extract metrics
-        if results and hasattr(results, "get"):
-            total_return = results.get("total_return", 0.0)
-            total_trades = results.get("total_trades", 0)
-            win_rate = results.get("win_rate", 0.0)
-            sharpe = results.get("sharpe_ratio", 0.0)
-            max_dd = results.get("max_drawdown", 0.0)
-            avg_win = results.get("avg_win", 0.0)
-            avg_loss = results.get("avg_loss", 0.0)
-        else:
-            # Default values if backtest fails
-            total_return = 0.0
-            total_trades = 0
-            win_rate = 0.0
-            sharpe = 0.0
-            max_dd = 0.0
-            avg_win = 0.0
-            avg_loss = 0.0
-        
-        return {
-            "symbol": symbol,
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
-            "total_trades": total_trades,
-            "win_rate": round(win_rate * 100, 2),
-            "avg_win": round(avg_win, 2),
-            "avg_loss": round(avg_loss, 2),
-            "max_drawdown": round(max_dd * 100, 2),
-            "sharpe_ratio": round(sharpe, 2),
-            "total_return": round(total_return * 100, 2),
-        }
+        task = _BACKTEST_INFLIGHT.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(
+                _execute_backtest(cache_key, label, list(symbols), start_date, end_date)
+            )
+            _BACKTEST_INFLIGHT[cache_key] = task
+            task.add_done_callback(lambda _: _BACKTEST_INFLIGHT.pop(cache_key, None))
         
+        # Shield so one caller disconnecting doesn't cancel the run for the others
+        return await asyncio.shield(task)
+    
     except Exception as e:
-        logger.error(f"Backtest error for {symbol}: {e}")
+        logger.error(f"Backtest error for {label}: {e}")
         
         # Return default data on error
         return {
-            "symbol": symbol,
+            "symbol": label,
             "start_date": start_date.isoformat(),
             "end_date": end_date.isoformat(),
             "total_trades": 0,
@@ -81,3 +143,67 @@ async def run_backtest(symbol: str, days: int = 90) -> Dict:
             "sharpe_ratio": 0.0,
             "total_return": 0.0,
         }
+
+
+async def _execute_backtest(
+    cache_key: tuple, label: str, symbols: List[str], start_date: datetime, end_date: datetime
+) -> Dict:
+    """Run one backtest in the pool and cache a successful summary before waiters resume"""
+    global _backtest_pool
+    loop = asyncio.get_running_loop()
+    async with _backtest_sem:
+        pool = _backtest_pool
+        try:
+            results = await loop.run_in_executor(pool, _sync_backtest, symbols, start_date, end_date)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed) and the executor refuses new work;
+            # replace it once, unless another run already did, and retry
+            if _backtest_pool is pool:
+                logger.warning("Backtest pool broken, starting a new one")
+                pool.shutdown(wait=False, cancel_futures=True)
+                _backtest_pool = _new_backtest_pool()
+            results = await loop.run_in_executor(
+                _backtest_pool, _sync_backtest, symbols, start_date, end_date
+            )
+    
+    # Extract metrics
+    succeeded = bool(results) and hasattr(results, "get")
+    if succeeded:
+        total_return = results.get("total_return", 0.0)
+        total_trades = results.get("total_trades", 0)
+        win_rate = results.get("win_rate", 0.0)
+        sharpe = results.get("sharpe_ratio", 0.0)
+        max_dd = results.get("max_drawdown", 0.0)
+        avg_win = results.get("avg_win", 0.0)
+        avg_loss = results.get("avg_loss", 0.0)
+    else:
+        # Default values if backtest fails
+        total_return = 0.0
+        total_trades = 0
+        win_rate = 0.0
+        sharpe = 0.0
+        max_dd = 0.0
+        avg_win = 0.0
+        avg_loss = 0.0
+    
+    result = {
+        "symbol": label,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "total_trades": total_trades,
+        "win_rate": round(win_rate * 100, 2),
+        "avg_win": round(avg_win, 2),
+        "avg_loss": round(avg_loss, 2),
+        "max_drawdown": round(max_dd * 100, 2),
+        "sharpe_ratio": round(sharpe, 2),
+        "total_return": round(total_return * 100, 2),
+    }
+    
+    # Keep only today's results; a failed run is not cached so the next request retries it
+    if succeeded:
+        today = end_date.date()
+        for key in [k for k in _BACKTEST_CACHE if k[2] != today]:
+            del _BACKTEST_CACHE[key]
+        _BACKTEST_CACHE[cache_key] = result
+    
+    return result
@@ -1,5 +1,7 @@
 """Configuration management using pydantic-settings"""
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
 from typing import Optional
 
 
@@ -10,7 +12,8 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
-        extra="ignore"
+        extra="ignore",
+        frozen=True,
     )
     
     # API Keys
@@ -22,6 +25,9 @@ class Settings(BaseSettings):
     alpaca_paper: bool = True
     alpaca_base_url: str = "https://paper-api.alpaca.markets"
     
+    # Groq Configuration
+    groq_max_concurrency: int = Field(default=8, ge=1)  # Max in-flight Groq requests
+    
     # Trading Configuration
     max_position_size: float = 10000.0  # Max $ per position
     max_portfolio_risk: float = 0.02  # 2% max risk per trade
@@ -33,6 +39,7 @@ class Settings(BaseSettings):
     # Strategy Settings
     strategy_mode: str = "paper"  # paper, backtest, live
     enable_live_trading: bool = False
+    backtest_workers: int = Field(default=1, ge=1)  # Backtest worker processes (~150MB each)
     
     # Database
     database_url: str = "sqlite+aiosqlite:///./gap_scanner.db"
@@ -44,7 +51,7 @@ class Settings(BaseSettings):
     workers: int = 1
     
     # CORS
-    cors_origins: list[str] = ["*"]
+    cors_origins: tuple[str, ...] = ("*",)
     
     # Monitoring
     enable_metrics: bool = True
@@ -53,5 +60,11 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build and validate settings once per process"""
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
@@ -1,12 +1,26 @@
 """Data fetching service using OpenBB SDK and Alpaca"""
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from typing import List, Dict, NamedTuple, Optional
+from datetime import datetime, timedelta, time as dt_time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest, StockLatestQuoteRequest
+from alpaca.data.requests import StockBarsRequest, StockSnapshotRequest
 from alpaca.data.timeframe import TimeFrame
 from alpaca.trading.client import TradingClient
+from aiolimiter import AsyncLimiter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sqlalchemy import select
 from config import settings
+from database import async_session_maker
+from models import SymbolStats
+from watchlists import SCAN
+import asyncio
+import hashlib
 import logging
+import time
+import numpy as np
+import orjson
 import pytz
 
 logger = logging.getLogger(__name__)
@@ -15,7 +29,7 @@ logger = logging.getLogger(__name__)
 stock_client = StockHistoricalDataClient(
     api_key=settings.alpaca_api_key,
     secret_key=settings.alpaca_secret_key,
-    raw_data=False,
+    raw_data=True,  # Skip per-bar model objects; we only need plain columns
     url_override=None,
 )
 
@@ -26,104 +40,392 @@ trading_client = TradingClient(
 )
 
 
+def _mount_pooled_adapter(client) -> None:
+    """Share one sized keep-alive connection pool across all calls of an SDK client"""
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.3),
+    )
+    client._session.mount("https://", adapter)
+    client._session.mount("http://", adapter)
+
+
+_mount_pooled_adapter(stock_client)
+_mount_pooled_adapter(trading_client)
+
+# Global limits for Alpaca calls: bounded concurrency plus the free tier's 200 req/min
+ALPACA_MAX_CONCURRENCY = 8
+_alpaca_sem = asyncio.Semaphore(ALPACA_MAX_CONCURRENCY)
+_alpaca_limiter = AsyncLimiter(200, 60)
+
+# The SDK is synchronous; its calls get their own threads so they never
+# queue behind (or starve) other work on the loop's default executor
+_alpaca_pool = ThreadPoolExecutor(max_workers=ALPACA_MAX_CONCURRENCY, thread_name_prefix="alpaca")
+
+
+async def _call_alpaca(fn, *args):
+    """Run a blocking SDK call in a worker thread under the global Alpaca limits"""
+    async with _alpaca_sem, _alpaca_limiter:
+        return await asyncio.get_running_loop().run_in_executor(_alpaca_pool, fn, *args)
+
+
+def shutdown_alpaca_pool():
+    """Stop Alpaca worker threads"""
+    _alpaca_pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Response timestamps only need second resolution; format once per second
+_NOW_ISO = {"second": 0, "value": ""}
+
+
+def now_iso() -> str:
+    """Current local time as an ISO string, cached per second"""
+    second = int(time.time())
+    if second != _NOW_ISO["second"]:
+        _NOW_ISO["second"] = second
+        _NOW_ISO["value"] = datetime.fromtimestamp(second).isoformat()
+    return _NOW_ISO["value"]
+
+
+# In-memory TTL cache for Alpaca responses: key -> (expires_at, value)
+# Daily bars change at most once a day, quotes/snapshots are only useful for seconds
+DAILY_BARS_TTL = 3600.0
+INTRADAY_BARS_TTL = 60.0
+QUOTES_TTL = 5.0
+_CACHE_MAX_ENTRIES = 256
+_BARS_CACHE: Dict[tuple, tuple] = {}
+_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def _cache_get(key: tuple):
+    """Return a cached value, or None if missing or expired"""
+    expires_at, value = _BARS_CACHE.get(key, (0.0, None))
+    if time.monotonic() < expires_at:
+        _CACHE_STATS["hits"] += 1
+        return value
+    _CACHE_STATS["misses"] += 1
+    return None
+
+
+def cache_stats() -> Dict:
+    """Hit/miss counters and size of the in-memory response cache"""
+    return {**_CACHE_STATS, "entries": len(_BARS_CACHE)}
+
+
+def _cache_set(key: tuple, value, ttl: float):
+    """Store a value, evicting expired entries once the cache grows large"""
+    now = time.monotonic()
+    if len(_BARS_CACHE) >= _CACHE_MAX_ENTRIES:
+        for stale in [k for k, (exp, _) in _BARS_CACHE.items() if exp <= now]:
+            del _BARS_CACHE[stale]
+    _BARS_CACHE[key] = (now + ttl, value)
+
+
+async def _get_bars_cached(request_params: StockBarsRequest, key: tuple, ttl: float):
+    """Fetch bars through the TTL cache"""
+    bars = _cache_get(key)
+    if bars is None:
+        bars = await _call_alpaca(stock_client.get_stock_bars, request_params)
+        _cache_set(key, bars, ttl)
+    return bars
+
+
+async def _get_snapshots_cached(request_params: StockSnapshotRequest, key: tuple):
+    """Fetch snapshots (latest quote + daily bars) through the TTL cache"""
+    snapshots = _cache_get(key)
+    if snapshots is None:
+        snapshots = await _call_alpaca(stock_client.get_stock_snapshot, request_params)
+        _cache_set(key, snapshots, QUOTES_TTL)
+    return snapshots
+
+
+# Map timeframe string to Alpaca TimeFrame
+_TIMEFRAMES = {
+    "1M": TimeFrame.Minute,
+    "5M": TimeFrame(5, "Min"),
+    "15M": TimeFrame(15, "Min"),
+    "1H": TimeFrame.Hour,
+    "1D": TimeFrame.Day,
+}
+
+# The watchlist snapshot request never changes shape; validate it once
+_SCAN_SNAPSHOT_REQUEST = StockSnapshotRequest(
+    symbol_or_symbols=list(SCAN),
+    feed="iex",  # Use IEX feed for free tier
+)
+
+
+@lru_cache(maxsize=64)
+def _bars_request(symbols: tuple, timeframe: str, start: datetime) -> StockBarsRequest:
+    """
+    Build a bars request once per shape
+    End is left open (the API defaults to now), so callers that floor
+    start to the day or minute share one validated request object
+    """
+    return StockBarsRequest(
+        symbol_or_symbols=list(symbols),
+        timeframe=_TIMEFRAMES[timeframe],
+        start=start,
+        feed="iex",  # Use IEX feed instead of SIP for free tier
+    )
+
+
+# Average volume is kept as a per-symbol EMA of daily volume, refreshed once a day
+VOLUME_EMA_ALPHA = 2 / (5 + 1)  # ~5-day EMA
+VOLUME_STATS_REFRESH_HOUR_ET = 5  # Before premarket
+VOLUME_STATS_RETRY_MIN = 60.0  # Seconds before the first retry after a failed refresh
+VOLUME_STATS_RETRY_MAX = 300.0  # Retry backoff cap
+_VOLUME_STATS_KEY = ("volume_stats", SCAN)
+
+
+async def refresh_volume_stats(symbols=SCAN) -> None:
+    """Fold completed daily bars into each symbol's volume EMA and persist it"""
+    start_day = datetime.combine(datetime.now().date() - timedelta(days=10), dt_time.min)
+    today = datetime.now(pytz.timezone("US/Eastern")).date().isoformat()
+    
+    bars = await _call_alpaca(
+        stock_client.get_stock_bars,
+        _bars_request(tuple(symbols), "1D", start_day),
+    )
+    
+    async with async_session_maker() as session:
+        result = await session.execute(select(SymbolStats).where(SymbolStats.symbol.in_(symbols)))
+        existing = {row.symbol: row for row in result.scalars()}
+        
+        for symbol in symbols:
+            # Only completed sessions; today's bar is still forming
+            completed = [bar for bar in bars.get(symbol) or () if bar["t"][:10] < today]
+            if not completed:
+                continue
+            
+            stats = existing.get(symbol)
+            if stats is None:
+                # Seed from the plain mean of the last five sessions
+                recent = completed[-5:]
+                session.add(SymbolStats(
+                    symbol=symbol,
+                    avg_volume=sum(bar["v"] for bar in recent) / len(recent),
+                    ema_alpha=VOLUME_EMA_ALPHA,
+                    last_bar_date=completed[-1]["t"][:10],
+                ))
+                continue
+            
+            ema = stats.avg_volume
+            for bar in completed:
+                if bar["t"][:10] > stats.last_bar_date:
+                    ema = VOLUME_EMA_ALPHA * bar["v"] + (1 - VOLUME_EMA_ALPHA) * ema
+            stats.avg_volume = ema
+            stats.ema_alpha = VOLUME_EMA_ALPHA
+            stats.last_bar_date = completed[-1]["t"][:10]
+        
+        await session.commit()
+    
+    _BARS_CACHE.pop(_VOLUME_STATS_KEY, None)
+    logger.info(f"Volume stats refreshed for {len(symbols)} symbols")
+
+
+async def _get_avg_volumes() -> Dict[str, float]:
+    """Read persisted average volumes for the watchlist (one SELECT per day)"""
+    avg_volumes = _cache_get(_VOLUME_STATS_KEY)
+    if avg_volumes is None:
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(SymbolStats.symbol, SymbolStats.avg_volume).where(SymbolStats.symbol.in_(SCAN))
+            )
+            avg_volumes = dict(result.all())
+        _cache_set(_VOLUME_STATS_KEY, avg_volumes, DAILY_BARS_TTL)
+    return avg_volumes
+
+
+def _seconds_until_next_refresh() -> float:
+    """Seconds until the next daily volume stats refresh"""
+    et_tz = pytz.timezone("US/Eastern")
+    now_et = datetime.now(et_tz)
+    next_run = now_et.replace(hour=VOLUME_STATS_REFRESH_HOUR_ET, minute=0, second=0, microsecond=0)
+    if next_run <= now_et:
+        next_run += timedelta(days=1)
+    return (next_run - now_et).total_seconds()
+
+
+async def run_volume_stats_refresher() -> None:
+    """
+    Background task: refresh volume stats at startup and then once a day
+    A failed refresh is retried with capped backoff rather than waiting a day,
+    since volume ratios fall back to 1.0 until stats exist
+    """
+    retry_delay = VOLUME_STATS_RETRY_MIN
+    while True:
+        try:
+            await refresh_volume_stats()
+        except Exception as e:
+            logger.error(f"Error refreshing volume stats, retrying in {retry_delay:.0f}s: {e}")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, VOLUME_STATS_RETRY_MAX)
+            continue
+        retry_delay = VOLUME_STATS_RETRY_MIN
+        await asyncio.sleep(_seconds_until_next_refresh())
+
+
+class GapsSnapshot(NamedTuple):
+    """One gap scan in every shape the endpoints need"""
+    gaps: List[Dict]
+    by_symbol: Dict[str, Dict]
+    body: bytes  # orjson-serialized gaps
+    etag: str
+    scanned_at: float  # time.time() of the scan
+
+
+_GAPS_KEY = ("gaps", SCAN)
+_gaps_lock = asyncio.Lock()
+
+
+async def get_gaps_snapshot() -> GapsSnapshot:
+    """
+    Current gap scan, shared across endpoints for QUOTES_TTL seconds
+    Concurrent callers on a cold cache wait for a single scan
+    """
+    snapshot = _cache_get(_GAPS_KEY)
+    if snapshot is None:
+        async with _gaps_lock:
+            snapshot = _cache_get(_GAPS_KEY)
+            if snapshot is None:
+                gaps = await _scan_market_gaps()
+                body = orjson.dumps(gaps)
+                snapshot = GapsSnapshot(
+                    gaps=gaps,
+                    by_symbol={g["symbol"]: g for g in gaps},
+                    body=body,
+                    etag=f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"',
+                    scanned_at=time.time(),
+                )
+                _cache_set(_GAPS_KEY, snapshot, QUOTES_TTL)
+    return snapshot
+
+
 async def get_market_gaps() -> List[Dict]:
+    """Current market gaps"""
+    return (await get_gaps_snapshot()).gaps
+
+
+async def get_gap(symbol: str) -> Optional[Dict]:
+    """Current gap for a single symbol, or None if it is not gapping"""
+    return (await get_gaps_snapshot()).by_symbol.get(symbol)
+
+
+async def _scan_market_gaps() -> List[Dict]:
     """
     Scan for market gaps using Alpaca data
     This is optimized to work within free tier limits
     """
-    gaps = []
-    
     # Watchlist of most active stocks
-    symbols = [
-        "SPY", "QQQ", "IWM", "DIA",  # ETFs
-        "AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "AMD",  # Mega caps
-        "NFLX", "BABA", "COIN", "PLTR", "SOFI", "MARA", "RIOT",  # High volatility
-    ]
+    symbols = list(SCAN)
     
     try:
-        # Get previous close
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=5)
+        # Average volumes come from the daily EMA stats, not a bars request
+        snapshots, avg_volumes = await asyncio.gather(
+            _get_snapshots_cached(_SCAN_SNAPSHOT_REQUEST, ("snapshots", SCAN, "iex")),
+            _get_avg_volumes(),
+        )
         
-        for symbol in symbols:
-            try:
-                # Get historical bars using IEX feed (free tier compatible)
-                request_params = StockBarsRequest(
-                    symbol_or_symbols=symbol,
-                    timeframe=TimeFrame.Day,
-                    start=start_date,
-                    end=end_date,
-                    feed="iex",  # Use IEX feed instead of SIP for free tier
-                )
-                bars = stock_client.get_stock_bars(request_params)
-                
-                if not bars or symbol not in bars:
-                    continue
-                
-                bars_df = bars[symbol].df
-                if len(bars_df) < 2:
-                    continue
-                
-                prev_close = bars_df["close"].iloc[-2]
-                
-                # Get current price using IEX feed
-                quote_request = StockLatestQuoteRequest(
-                    symbol_or_symbols=symbol,
-                    feed="iex"  # Use IEX feed for free tier
-                )
-                quote = stock_client.get_stock_latest_quote(quote_request)
-                
-                if symbol not in quote:
-                    continue
-                
-                current_price = float(quote[symbol].ask_price or quote[symbol].bid_price or prev_close)
-                
-                # Calculate gap
-                gap_percent = ((current_price - prev_close) / prev_close) * 100
-                
-                # Only include significant gaps
-                if abs(gap_percent) < 1.5:
-                    continue
-                
-                # Calculate volume metrics
-                current_volume = int(bars_df["volume"].iloc[-1])
-                avg_volume = int(bars_df["volume"].mean())
-                volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1.0
-                
-                # Get premarket high/low (approximate from current data)
-                premarket_high = current_price * 1.005
-                premarket_low = current_price * 0.995
-                
-                gap_data = {
-                    "symbol": symbol,
-                    "name": symbol,  # Would need separate API for company names
-                    "gap_percent": round(gap_percent, 2),
-                    "current_price": round(current_price, 2),
-                    "previous_close": round(prev_close, 2),
-                    "volume": current_volume,
-                    "volume_ratio": round(volume_ratio, 2),
-                    "sentiment_score": 0.5,  # Default, can be enhanced with news
-                    "historical_fill_rate": 65,  # Would calculate from historical data
-                    "conviction": _calculate_conviction(gap_percent, volume_ratio),
-                    "sector": "Technology",  # Would need separate data source
-                    "market_cap": "Large",
-                    "premarket_high": round(premarket_high, 2),
-                    "premarket_low": round(premarket_low, 2),
-                    "vwap": round(bars_df["vwap"].iloc[-1] if "vwap" in bars_df else current_price, 2),
-                    "last_updated": datetime.now().isoformat(),
-                }
-                
-                gaps.append(gap_data)
-                logger.info(f"Gap detected: {symbol} at {gap_percent:.2f}%")
-                
-            except Exception as e:
-                logger.warning(f"Failed to process {symbol}: {e}")
-                continue
+        # Raw snapshots: {symbol: {"latestQuote", "dailyBar", "prevDailyBar", ...}}
+        syms = [
+            s for s in symbols
+            if snapshots.get(s) and snapshots[s].get("prevDailyBar") and snapshots[s].get("dailyBar")
+        ]
+        if not syms:
+            logger.info("Found 0 gaps")
+            return []
+        
+        n = len(syms)
+        snaps = [snapshots[s] for s in syms]
+        
+        # Previous close, today's volume and vwap come straight from the snapshot
+        prev_close = np.fromiter((snap["prevDailyBar"]["c"] for snap in snaps), dtype=np.float64, count=n)
+        current_volume = np.fromiter((snap["dailyBar"]["v"] for snap in snaps), dtype=np.int64, count=n)
+        vwap = np.fromiter(
+            (snap["dailyBar"].get("vw", snap["dailyBar"]["c"]) for snap in snaps),
+            dtype=np.float64,
+            count=n,
+        )
+        quotes = [snap.get("latestQuote") or {} for snap in snaps]
+        current_price = np.array(
+            [float(q.get("ap") or q.get("bp") or pc) for q, pc in zip(quotes, prev_close)],
+            dtype=np.float64,
+        )
+        
+        # Average volume per symbol from the persisted EMA (0 = not seeded yet)
+        avg_volume = np.fromiter(
+            (avg_volumes.get(s, 0.0) for s in syms), dtype=np.float64, count=n
+        ).astype(np.int64)
         
-        # Sort by absolute gap percent
-        gaps.sort(key=lambda x: abs(x["gap_percent"]), reverse=True)
+        # Calculate gaps and volume metrics for all symbols at once
+        gap_pct = (current_price - prev_close) / prev_close * 100
+        volume_ratio = np.divide(
+            current_volume,
+            avg_volume,
+            out=np.ones(n, dtype=np.float64),
+            where=avg_volume > 0,
+        )
+        
+        # Only include significant gaps; everything below touches selected rows only
+        idx = np.flatnonzero(np.abs(gap_pct) >= 1.5)
+        
+        # Sort by absolute gap percent (largest first) before building output
+        idx = idx[np.argsort(-np.abs(gap_pct[idx]), kind="stable")]
+        price = current_price[idx]
+        
+        # Round every float column in one pass over a single (7, k) block,
+        # premarket high/low approximated from current data
+        (
+            gap_col, price_col, prev_col, ratio_col, high_col, low_col, vwap_col
+        ) = np.round(
+            np.vstack((
+                gap_pct[idx],
+                price,
+                prev_close[idx],
+                volume_ratio[idx],
+                price * 1.005,
+                price * 0.995,
+                vwap[idx],
+            )),
+            2,
+        ).tolist()
+        volume_col = current_volume[idx].tolist()
+        conviction_col = _CONVICTION_LABELS[
+            _conviction_codes(gap_pct[idx], volume_ratio[idx])
+        ].tolist()
+        symbol_col = [syms[i] for i in idx]
+        last_updated = now_iso()
         
-        logger.info(f"Found {len(gaps)} gaps")
+        # Output list is sized up front and filled by position
+        gaps: List[Dict] = [None] * len(idx)
+        for out_i, row in enumerate(zip(
+            symbol_col, gap_col, price_col, prev_col, volume_col, ratio_col,
+            conviction_col, high_col, low_col, vwap_col,
+        )):
+            symbol, gap, cur, prev, volume, ratio, conviction, high, low, vw = row
+            gaps[out_i] = {
+                "symbol": symbol,
+                "name": symbol,  # Would need separate API for company names
+                "gap_percent": gap,
+                "current_price": cur,
+                "previous_close": prev,
+                "volume": volume,
+                "volume_ratio": ratio,
+                "sentiment_score": 0.5,  # Default, can be enhanced with news
+                "historical_fill_rate": 65,  # Would calculate from historical data
+                "conviction": conviction,
+                "sector": "Technology",  # Would need separate data source
+                "market_cap": "Large",
+                "premarket_high": high,
+                "premarket_low": low,
+                "vwap": vw,
+                "last_updated": last_updated,
+            }
+            logger.debug("Gap detected: %s at %.2f%%", symbol, gap)
+        
+        logger.info("Found %d gaps", len(gaps))
         return gaps
         
     except Exception as e:
@@ -131,88 +433,72 @@ async def get_market_gaps() -> List[Dict]:
         return []
 
 
-def _calculate_conviction(gap_percent: float, volume_ratio: float) -> str:
-    """Calculate conviction level based on gap metrics"""
-    score = 0
-    
-    # Gap size scoring
-    if abs(gap_percent) > 5:
-        score += 2
-    elif abs(gap_percent) > 3:
-        score += 1
+_CONVICTION_LABELS = np.array(["low", "medium", "high"])
+
+
+def _conviction_codes(gap_percent: np.ndarray, volume_ratio: np.ndarray) -> np.ndarray:
+    """
+    Calculate conviction codes (0=low, 1=medium, 2=high) based on gap metrics
+    Vectorized over arrays of gap percent and volume ratio
+    """
+    abs_gap = np.abs(gap_percent)
     
-    # Volume scoring
-    if volume_ratio > 3:
-        score += 2
-    elif volume_ratio > 2:
-        score += 1
+    # Gap size scoring + volume scoring
+    score = (
+        np.where(abs_gap > 5, 2, np.where(abs_gap > 3, 1, 0))
+        + np.where(volume_ratio > 3, 2, np.where(volume_ratio > 2, 1, 0))
+    )
     
     # Determine conviction
-    if score >= 3:
-        return "high"
-    elif score >= 2:
-        return "medium"
-    else:
-        return "low"
+    return np.where(score >= 3, 2, np.where(score >= 2, 1, 0)).astype(np.int8)
 
 
-async def get_chart_data(symbol: str, timeframe: str = "1D") -> List[Dict]:
-    """Get chart data for a symbol"""
+async def get_chart_bars(symbol: str, timeframe: str = "1D") -> List[Dict]:
+    """Raw Alpaca bars for a chart, oldest first; empty on error"""
     try:
-        # Map timeframe string to Alpaca TimeFrame
-        tf_map = {
-            "1M": TimeFrame.Minute,
-            "5M": TimeFrame(5, "Min"),
-            "15M": TimeFrame(15, "Min"),
-            "1H": TimeFrame.Hour,
-            "1D": TimeFrame.Day,
-        }
+        tf_name = timeframe if timeframe in _TIMEFRAMES else "1D"
         
-        alpaca_tf = tf_map.get(timeframe, TimeFrame.Day)
-        
-        # Calculate date range
-        days = 1 if "M" in timeframe or "H" in timeframe else 30
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        # Calculate date range, floored so repeat calls reuse the same request
+        is_intraday = "M" in timeframe or "H" in timeframe
+        if is_intraday:
+            start_date = (datetime.now() - timedelta(days=1)).replace(second=0, microsecond=0)
+        else:
+            start_date = datetime.combine(datetime.now().date() - timedelta(days=30), dt_time.min)
         
-        request_params = StockBarsRequest(
-            symbol_or_symbols=symbol,
-            timeframe=alpaca_tf,
-            start=start_date,
-            end=end_date,
-            feed="iex",  # Use IEX feed for free tier
+        bars = await _get_bars_cached(
+            _bars_request((symbol,), tf_name, start_date),
+            ("bars", (symbol,), timeframe, start_date.date(), "iex"),
+            INTRADAY_BARS_TTL if is_intraday else DAILY_BARS_TTL,
         )
         
-        bars = stock_client.get_stock_bars(request_params)
-        
-        if not bars or symbol not in bars:
-            return []
-        
-        bars_df = bars[symbol].df
-        
-        # Convert to chart format
-        chart_data = []
-        for idx, row in bars_df.iterrows():
-            chart_data.append({
-                "time": idx.isoformat(),
-                "open": float(row["open"]),
-                "high": float(row["high"]),
-                "low": float(row["low"]),
-                "close": float(row["close"]),
-                "volume": int(row["volume"]),
-            })
-        
-        return chart_data
+        return (bars or {}).get(symbol) or []
         
     except Exception as e:
         logger.error(f"Error fetching chart data for {symbol}: {e}")
         return []
 
 
+def chart_row(bar: Dict) -> Dict:
+    """Map a raw bar (already plain JSON values) to the chart format"""
+    return {
+        "time": bar["t"],
+        "open": bar["o"],
+        "high": bar["h"],
+        "low": bar["l"],
+        "close": bar["c"],
+        "volume": int(bar["v"]),
+    }
+
+
+async def get_chart_data(symbol: str, timeframe: str = "1D") -> List[Dict]:
+    """Get chart data for a symbol"""
+    return [chart_row(bar) for bar in await get_chart_bars(symbol, timeframe)]
+
+
 async def get_account_info() -> Dict:
     """Get trading account information"""
     try:
-        account = trading_client.get_account()
+        account = await _call_alpaca(trading_client.get_account)
         return {
             "cash": float(account.cash),
             "portfolio_value": float(account.portfolio_value),
@@ -228,7 +514,7 @@ async def get_account_info() -> Dict:
 async def get_positions() -> List[Dict]:
     """Get current positions"""
     try:
-        positions = trading_client.get_all_positions()
+        positions = await _call_alpaca(trading_client.get_all_positions)
         return [
             {
                 "symbol": pos.symbol,
@@ -299,7 +585,7 @@ async def get_market_status() -> Dict:
         logger.error(f"Error getting market status: {e}")
         return {
             "is_open": False,
-            "current_time": datetime.now().isoformat(),
+            "current_time": now_iso(),
             "next_open": None,
             "market_hours": "9:30 AM - 4:00 PM ET",
         }
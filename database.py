@@ -1,20 +1,61 @@
 """Database connection and session management"""
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 from models import Base
 from config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+is_sqlite = "sqlite" in settings.database_url
+is_memory = is_sqlite and ":memory:" in settings.database_url
+
+# Connection pool sizing. SQLite has a single writer and each aiosqlite
+# connection owns a thread, so a file database gets a small pool; a server
+# database can use more concurrent connections
+if is_sqlite:
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 2
+    DB_WARM_CONNECTIONS = 2
+else:
+    DB_POOL_SIZE = 20
+    DB_MAX_OVERFLOW = 10
+    DB_WARM_CONNECTIONS = 5
+
+if is_memory:
+    # An in-memory database only exists on its one connection
+    pool_kwargs = {"poolclass": StaticPool}
+else:
+    pool_kwargs = {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+
 # Create async engine with optimized settings for Northflank free tier
 engine = create_async_engine(
     settings.database_url,
     echo=False,
-    poolclass=StaticPool,  # Single connection pool for SQLite
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
+    connect_args={"check_same_thread": False, "timeout": 30} if is_sqlite else {},
+    **pool_kwargs,
 )
 
+
+if is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Enable WAL so readers don't block the writer, and group fsyncs"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=33554432")  # 32MB per connection
+        cursor.close()
+
 # Session factory
 async_session_maker = async_sessionmaker(
     engine,
@@ -43,12 +84,41 @@ async def init_db():
     try:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            # create_all skips tables that already exist, so indexes added
+            # after a database was created have to be backfilled explicitly
+            await conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_trades_entry_date ON trades (entry_date)"
+            ))
+            await conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_trades_symbol_entry_date ON trades (symbol, entry_date DESC)"
+            ))
+        if not is_memory:
+            await _warm_pool()
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
 
 
+async def _warm_pool():
+    """Open a few connections now so the first requests don't pay for them"""
+    conns = [await engine.connect() for _ in range(DB_WARM_CONNECTIONS)]
+    for conn in conns:
+        await conn.execute(text("SELECT 1"))
+        await conn.close()
+
+
+async def ping_db() -> bool:
+    """Check that the database answers a trivial query"""
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.error(f"Database ping failed: {e}")
+        return False
+
+
 async def close_db():
     """Close database connections"""
     await engine.dispose()
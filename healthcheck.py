@@ -2,9 +2,10 @@
 """Simple health check script for Docker/Northflank"""
 import sys
 try:
-    import httpx
-    response = httpx.get("http://localhost:8000/health", timeout=5.0)
-    if response.status_code == 200:
+    import http.client
+    conn = http.client.HTTPConnection("127.0.0.1", 8000, timeout=5.0)
+    conn.request("GET", "/health")
+    if conn.getresponse().status == 200:
         sys.exit(0)
     sys.exit(1)
 except Exception:
@@ -1,17 +1,23 @@
 """FastAPI application - Bridge between frontend and Lumibot strategy"""
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, Path, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from contextlib import asynccontextmanager
+from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+import hashlib
 import logging
+import logging.handlers
+import queue
 import sys
 import asyncio
-from typing import List
+from typing import Annotated, List, Optional
+import orjson
+from pydantic import AfterValidator
 
 # Local imports
 from config import settings
-from database import init_db, close_db, get_db
+from database import init_db, close_db, get_db, ping_db, async_session_maker
 from models import (
     GapDataResponse,
     NewsItemResponse,
@@ -21,27 +27,58 @@ from models import (
     StrategyStatus,
     Trade,
 )
-from data_service import get_market_gaps, get_chart_data, get_account_info, get_positions, get_market_status
-from sentiment_service import get_news_sentiment, get_gap_reason
-from backtest_service import run_backtest
-
-# Configure logging
+from data_service import (
+    get_gaps_snapshot,
+    get_gap,
+    get_chart_bars,
+    get_chart_data,
+    chart_row,
+    get_account_info,
+    get_positions,
+    get_market_status,
+    run_volume_stats_refresher,
+    now_iso,
+    cache_stats,
+    shutdown_alpaca_pool,
+)
+from sentiment_service import get_news_sentiment, get_gap_reason, close_sentiment_client
+from backtest_service import run_backtest, shutdown_backtest_pool
+
+# Configure logging: handlers enqueue records and a background thread
+# writes them to stdout, so request handlers never block on log I/O
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _stdout_handler)
+_log_listener.start()
+
+# QueueHandler.prepare() formats the record before enqueueing; keep it to
+# the bare message so the listener's formatter adds the only prefix
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper()),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=sys.stdout,
+    handlers=[_queue_handler],
 )
 logger = logging.getLogger(__name__)
 
+# Ticker path parameter; malformed symbols are rejected with 422 before any
+# lookup, and lowercase tickers are accepted and uppercased as before
+Symbol = Annotated[str, Path(pattern=r"^[A-Za-z][A-Za-z0-9.\-]{0,9}$"), AfterValidator(str.upper)]
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     logger.info("Starting Gap Scanner API...")
+    logger.info("Event loop: %s", type(asyncio.get_running_loop()).__module__)
     
     # Initialize database
     await init_db()
     
+    # Keep per-symbol average volume stats fresh (once a day)
+    volume_stats_task = asyncio.create_task(run_volume_stats_refresher())
+    
     # TODO: Initialize Lumibot strategy in background thread
     # For now, strategy runs separately
     logger.info("API ready. Strategy can be started separately.")
@@ -49,8 +86,13 @@ async def lifespan(app: FastAPI):
     yield
     
     # Cleanup
+    volume_stats_task.cancel()
+    shutdown_backtest_pool()
+    shutdown_alpaca_pool()
+    await close_sentiment_client()
     await close_db()
     logger.info("API shutdown complete")
+    _log_listener.stop()
 
 
 # Create FastAPI app
@@ -59,6 +101,7 @@ app = FastAPI(
     description="Professional gap trading backend with Lumibot + Alpaca + FastAPI",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -86,12 +129,13 @@ async def root():
 async def health_check():
     """Detailed health check"""
     try:
-        account = await get_account_info()
+        account, db_ok = await asyncio.gather(get_account_info(), ping_db())
         return {
             "status": "healthy",
-            "database": "connected",
+            "database": "connected" if db_ok else "error",
             "alpaca": "connected" if account else "error",
-            "timestamp": datetime.now().isoformat(),
+            "cache": cache_stats(),
+            "timestamp": now_iso(),
         }
     except Exception as e:
         return JSONResponse(
@@ -103,27 +147,36 @@ async def health_check():
         )
 
 
-@app.get("/api/gaps", response_model=List[GapDataResponse])
-async def get_gaps():
+def _etag_response(request: Request, body: bytes, etag: Optional[str] = None) -> Response:
+    """JSON response tagged with a content hash; 304 if the client already has it"""
+    if etag is None:
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/api/gaps", responses={200: {"model": List[GapDataResponse]}})
+async def get_gaps(request: Request):
     """
     Get current market gaps
     
     Returns list of stocks with significant gaps
     """
     try:
-        gaps = await get_market_gaps()
-        return gaps
+        # Serialized and hashed once per scan in the response shape; skip re-validation
+        snapshot = await get_gaps_snapshot()
+        return _etag_response(request, snapshot.body, snapshot.etag)
     except Exception as e:
         logger.error(f"Error in /api/gaps: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/gaps/{symbol}", response_model=GapDataResponse)
-async def get_gap_details(symbol: str):
+async def get_gap_details(symbol: Symbol):
     """Get detailed gap information for a specific symbol"""
     try:
-        gaps = await get_market_gaps()
-        gap = next((g for g in gaps if g["symbol"] == symbol), None)
+        gap = await get_gap(symbol)
         
         if not gap:
             raise HTTPException(status_code=404, detail=f"Gap not found for {symbol}")
@@ -136,21 +189,38 @@ async def get_gap_details(symbol: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/chart/{symbol}", response_model=List[ChartDataResponse])
-async def get_chart(symbol: str, timeframe: str = "1D"):
+async def _iter_chart_ndjson(bars: List[dict]):
+    """Convert and serialize bars one at a time as newline-delimited JSON"""
+    for bar in bars:
+        yield orjson.dumps(chart_row(bar), option=orjson.OPT_APPEND_NEWLINE)
+
+
+@app.get("/api/chart/{symbol}", responses={200: {"model": List[ChartDataResponse]}})
+async def get_chart(request: Request, symbol: Symbol, timeframe: str = "1D"):
     """
     Get chart data for a symbol
     
     Timeframes: 1M, 5M, 15M, 1H, 1D
+    Send Accept: application/x-ndjson to receive one bar per line
     """
     try:
+        if "application/x-ndjson" in request.headers.get("accept", ""):
+            # Rows are built while streaming, so no chart list or full body is held
+            bars = await get_chart_bars(symbol, timeframe)
+            return StreamingResponse(_iter_chart_ndjson(bars), media_type="application/x-ndjson")
+        
         chart_data = await get_chart_data(symbol, timeframe)
-        return chart_data
+        # Rows are already plain JSON types; skip jsonable_encoder
+        return _etag_response(request, orjson.dumps(chart_data))
     except Exception as e:
         logger.error(f"Error in /api/chart/{symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Pre-serialized response for the common no-symbol news poll
+_EMPTY_NEWS = ORJSONResponse(content=[])
+
+
 @app.get("/api/news", response_model=List[NewsItemResponse])
 async def get_news(symbol: str = None):
     """
@@ -158,13 +228,12 @@ async def get_news(symbol: str = None):
     
     If symbol provided, returns symbol-specific news
     """
+    # General market news is not available yet
+    if not symbol:
+        return _EMPTY_NEWS
+    
     try:
-        if symbol:
-            news = await get_news_sentiment(symbol)
-        else:
-            # Return general market news
-            news = []
-        
+        news = await get_news_sentiment(symbol)
         return news
     except Exception as e:
         logger.error(f"Error in /api/news: {e}")
@@ -172,14 +241,13 @@ async def get_news(symbol: str = None):
 
 
 @app.get("/api/gap-reason/{symbol}")
-async def get_gap_reasoning(symbol: str):
+async def get_gap_reasoning(symbol: Symbol):
     """
     Get AI-generated explanation for why a gap occurred
     """
     try:
         # First get the gap data
-        gaps = await get_market_gaps()
-        gap = next((g for g in gaps if g["symbol"] == symbol), None)
+        gap = await get_gap(symbol)
         
         if not gap:
             raise HTTPException(status_code=404, detail=f"Gap not found for {symbol}")
@@ -196,7 +264,7 @@ async def get_gap_reasoning(symbol: str):
 
 
 @app.get("/api/backtest/{symbol}", response_model=BacktestResultResponse)
-async def backtest_symbol(symbol: str, days: int = 90):
+async def backtest_symbol(symbol: Symbol, days: int = 90):
     """
     Run backtest for gap strategy on a symbol
     
@@ -216,8 +284,7 @@ async def get_strategy_status():
     Get current strategy status and statistics
     """
     try:
-        account = await get_account_info()
-        positions = await get_positions()
+        account, positions = await asyncio.gather(get_account_info(), get_positions())
         
         return {
             "running": True,  # Will integrate with actual strategy later
@@ -255,15 +322,43 @@ async def save_trade(trade: TradeJournalEntry, db: AsyncSession = Depends(get_db
 
 
 @app.get("/api/trades")
-async def get_trades(db: AsyncSession = Depends(get_db)):
-    """Get trade journal entries"""
+async def get_trades(cursor_id: Optional[int] = None):
+    """
+    Get trade journal entries, newest first
+    
+    cursor_id: id of the last trade on the previous page
+    """
     try:
-        from sqlalchemy import select
+        # Keyset pagination on (entry_date, id) instead of OFFSET scans; id
+        # breaks ties between trades entered in the same second.
+        # Select plain columns so rows skip ORM object construction
+        query = (
+            select(
+                Trade.id, Trade.symbol, Trade.entry_date, Trade.entry_price,
+                Trade.exit_date, Trade.exit_price, Trade.quantity, Trade.direction,
+                Trade.reason, Trade.outcome, Trade.pnl, Trade.pnl_percent, Trade.notes,
+            )
+            .order_by(Trade.entry_date.desc(), Trade.id.desc())
+            .limit(50)
+        )
+        if cursor_id is not None:
+            # Compare against the cursor row's stored entry_date, not a bound
+            # datetime: SQLite keeps "YYYY-MM-DD HH:MM:SS" text, which never
+            # equals the driver's "...SS.000000" bind
+            boundary = select(Trade.entry_date).where(Trade.id == cursor_id).scalar_subquery()
+            query = query.where(
+                or_(
+                    Trade.entry_date < boundary,
+                    and_(Trade.entry_date == boundary, Trade.id < cursor_id),
+                )
+            )
         
-        result = await db.execute(select(Trade).order_by(Trade.entry_date.desc()).limit(50))
-        trades = result.scalars().all()
+        # Read-only: a plain session avoids the get_db dependency's commit/rollback
+        async with async_session_maker() as db:
+            result = await db.execute(query)
+            rows = result.all()
         
-        return [
+        return ORJSONResponse([
             {
                 "id": str(t.id),
                 "symbol": t.symbol,
@@ -279,8 +374,8 @@ async def get_trades(db: AsyncSession = Depends(get_db)):
                 "pnlPercent": t.pnl_percent,
                 "notes": t.notes,
             }
-            for t in trades
-        ]
+            for t in rows
+        ])
         
     except Exception as e:
         logger.error(f"Error fetching trades: {e}")
@@ -320,10 +415,6 @@ async def market_status():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Add datetime import
-from datetime import datetime
-
-
 # WebSocket endpoint for real-time gap updates
 @app.websocket("/ws/gaps")
 async def websocket_gaps(websocket: WebSocket):
@@ -336,15 +427,19 @@ async def websocket_gaps(websocket: WebSocket):
     
     try:
         while True:
-            # Fetch latest gaps
-            gaps = await get_market_gaps()
+            # Reuse the scan's serialized gaps instead of re-encoding them per client
+            snapshot = await get_gaps_snapshot()
             
-            # Send to client
-            await websocket.send_json({
-                "type": "gaps_update",
-                "data": gaps,
-                "timestamp": datetime.now().isoformat()
-            })
+            # Send to client; kept as a text frame so browsers can JSON.parse(event.data)
+            await websocket.send_text(
+                b"".join((
+                    b'{"type":"gaps_update","data":',
+                    snapshot.body,
+                    b',"timestamp":',
+                    orjson.dumps(now_iso()),
+                    b"}",
+                )).decode()
+            )
             
             # Wait 30 seconds before next update
             await asyncio.sleep(30)
@@ -368,5 +463,6 @@ if __name__ == "__main__":
         port=settings.port,
         reload=settings.reload,
         workers=settings.workers,
+        loop="uvloop",
         log_level=settings.log_level.lower(),
     )
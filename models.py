@@ -1,5 +1,5 @@
 """Database models and schemas"""
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, create_engine
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Index, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from pydantic import BaseModel, Field
@@ -34,7 +34,7 @@ class Trade(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String(10), index=True, nullable=False)
-    entry_date = Column(DateTime, default=func.now())
+    entry_date = Column(DateTime, default=func.now(), index=True)
     entry_price = Column(Float, nullable=False)
     exit_date = Column(DateTime, nullable=True)
     exit_price = Column(Float, nullable=True)
@@ -45,6 +45,21 @@ class Trade(Base):
     pnl = Column(Float, nullable=True)
     pnl_percent = Column(Float, nullable=True)
     notes = Column(Text, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_trades_symbol_entry_date", "symbol", entry_date.desc()),
+    )
+
+
+class SymbolStats(Base):
+    """Store slow-changing per-symbol statistics used by the gap scanner"""
+    __tablename__ = "symbol_stats"
+    
+    symbol = Column(String(10), primary_key=True)
+    avg_volume = Column(Float, nullable=False)  # EMA of daily volume
+    ema_alpha = Column(Float, nullable=False)
+    last_bar_date = Column(String(10), nullable=False)  # YYYY-MM-DD of last bar folded in
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 
 class Alert(Base):
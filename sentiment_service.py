@@ -1,11 +1,89 @@
 """Sentiment analysis service using Groq"""
 from typing import List, Dict, Optional
 from config import settings
+import asyncio
+import hashlib
 import logging
+import re
+import time
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# One keep-alive HTTP/2 client for all Groq calls instead of a new
+# connection + TLS handshake per request
+_groq_client = httpx.AsyncClient(
+    base_url="https://api.groq.com/openai/v1",
+    http2=True,
+    timeout=10.0,
+    limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+)
+
+
+# Cap in-flight Groq requests; HTTP/2 multiplexing means the connection
+# limits alone don't bound how many requests hit the rate limit at once
+_groq_sem = asyncio.Semaphore(settings.groq_max_concurrency)
+
+
+async def _groq_post(path: str, **kwargs) -> httpx.Response:
+    """POST to Groq under the global concurrency cap"""
+    async with _groq_sem:
+        return await _groq_client.post(path, **kwargs)
+
+
+async def close_sentiment_client():
+    """Stop the sentiment batcher and close the shared Groq HTTP client"""
+    if _sentiment_worker is not None:
+        _sentiment_worker.cancel()
+    await _groq_client.aclose()
+
+
+# Identical Groq prompts share one in-flight call, and successful answers
+# are reused for a minute: key -> task / (expires_at, value)
+GROQ_RESULT_TTL = 60.0
+_inflight: Dict[tuple, asyncio.Task] = {}
+_results: Dict[tuple, tuple] = {}
+
+# Models sometimes wrap the requested JSON array in prose; pull out the array itself
+_JSON_ARRAY_RE = re.compile(rb"\[[^\[\]]*\]")
+
+# Concurrent analyze_sentiment calls are queued and scored together: the
+# batcher waits up to GROQ_BATCH_WINDOW seconds for more texts (at most
+# GROQ_BATCH_MAX) and sends them as one Groq completion
+GROQ_BATCH_WINDOW = 0.03
+GROQ_BATCH_MAX = 32
+_sentiment_queue: asyncio.Queue = asyncio.Queue()
+_sentiment_worker: Optional[asyncio.Task] = None
+_sentiment_flushes: set = set()  # Running flush tasks, referenced until done
+
+
+async def _coalesced(key: tuple, fetch):
+    """Return a fresh cached result for key, or join/start the single call for it"""
+    expires_at, value = _results.get(key, (0.0, None))
+    if time.monotonic() < expires_at:
+        return value
+    
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(fetch())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    
+    # Shield so one caller disconnecting doesn't cancel the call for the others
+    value = await asyncio.shield(task)
+    if value is not None:
+        _cache_put(key, value)
+    return value
+
+
+def _cache_put(key: tuple, value):
+    """Keep value for GROQ_RESULT_TTL, dropping expired entries so _results stays bounded"""
+    now = time.monotonic()
+    for stale in [k for k, (exp, _) in _results.items() if exp <= now]:
+        del _results[stale]
+    _results[key] = (now + GROQ_RESULT_TTL, value)
+
 
 async def analyze_sentiment(text: str) -> float:
     """
@@ -17,70 +95,119 @@ async def analyze_sentiment(text: str) -> float:
         return 0.5
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.groq_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "mixtral-8x7b-32768",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a financial sentiment analyzer. Return ONLY a number between 0 and 1, where 0 is very bearish and 1 is very bullish. No explanation.",
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Analyze sentiment: {text}",
-                        },
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 10,
-                },
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                sentiment_text = result["choices"][0]["message"]["content"].strip()
-                
-                # Parse sentiment score
-                try:
-                    score = float(sentiment_text)
-                    return max(0.0, min(1.0, score))
-                except ValueError:
-                    logger.warning(f"Failed to parse sentiment score: {sentiment_text}")
-                    return 0.5
-            else:
-                logger.error(f"Groq API error: {response.status_code}")
-                return 0.5
-                
+        key = ("sentiment", hashlib.blake2b(text.encode(), digest_size=16).hexdigest())
+        score = await _coalesced(key, lambda: _score_batched(text))
+        return 0.5 if score is None else score
     except Exception as e:
         logger.error(f"Error analyzing sentiment: {e}")
         return 0.5
 
 
+async def _score_batched(text: str) -> Optional[float]:
+    """Queue text for the next batched Groq call and wait for its score"""
+    global _sentiment_worker
+    if _sentiment_worker is None or _sentiment_worker.done():
+        _sentiment_worker = asyncio.create_task(_run_sentiment_batcher())
+    
+    future = asyncio.get_running_loop().create_future()
+    _sentiment_queue.put_nowait((text, future))
+    return await future
+
+
+async def _run_sentiment_batcher():
+    """Drain queued texts into batches and flush each as one Groq call"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _sentiment_queue.get()]
+        deadline = loop.time() + GROQ_BATCH_WINDOW
+        while len(batch) < GROQ_BATCH_MAX:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_sentiment_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        # Flush in the background so the next batch collects during the call
+        task = asyncio.create_task(_flush_sentiments(batch))
+        _sentiment_flushes.add(task)
+        task.add_done_callback(_sentiment_flushes.discard)
+
+
+async def _flush_sentiments(batch: List[tuple]):
+    """Score a batch of (text, future) pairs and resolve each caller's future"""
+    try:
+        scores = await _fetch_sentiments([text for text, _ in batch])
+    except Exception as e:
+        logger.error(f"Error analyzing sentiment batch: {e}")
+        scores = None
+    
+    for i, (_, future) in enumerate(batch):
+        if not future.done():
+            future.set_result(None if scores is None else scores[i])
+
+
+async def _fetch_sentiments(texts: List[str]) -> Optional[List[float]]:
+    """Ask Groq for one score per text in a single completion; None if the call fails"""
+    numbered = "\n".join(f"{i}) {text}" for i, text in enumerate(texts, 1))
+    response = await _groq_post(
+        "/chat/completions",
+        headers={
+            "Authorization": f"Bearer {settings.groq_api_key}",
+            "Content-Type": "application/json",
+        },
+        json={
+            "model": "mixtral-8x7b-32768",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a financial sentiment analyzer. For each numbered line, score sentiment between 0 and 1, where 0 is very bearish and 1 is very bullish. Return ONLY a JSON array of numbers in the same order. No explanation.",
+                },
+                {
+                    "role": "user",
+                    "content": f"Analyze sentiment:\n{numbered}",
+                },
+            ],
+            "temperature": 0.3,
+            "max_tokens": 8 * len(texts) + 10,
+        },
+        timeout=15.0,
+    )
+    
+    if response.status_code != 200:
+        logger.error(f"Groq API error: {response.status_code}")
+        return None
+    
+    content = response.json()["choices"][0]["message"]["content"].strip()
+    match = _JSON_ARRAY_RE.search(content.encode())
+    try:
+        scores = [max(0.0, min(1.0, float(x))) for x in orjson.loads(match.group(0))]
+    except (AttributeError, orjson.JSONDecodeError, TypeError, ValueError):
+        logger.warning(f"Failed to parse sentiment scores: {content}")
+        return None
+    
+    if len(scores) != len(texts):
+        logger.warning(f"Expected {len(texts)} sentiment scores, got {len(scores)}")
+        return None
+    return scores
+
+
 async def get_news_sentiment(symbol: str) -> List[Dict]:
     """
     Get news and sentiment for a symbol
     Uses Alpaca News API (free with data subscription)
     """
     try:
-        # Note: Alpaca news requires subscription
-        # For free tier, return mock data
-        news = [
-            {
-                "id": "1",
-                "title": f"{symbol} Shows Strong Premarket Activity",
-                "summary": "Stock experiencing increased volatility in premarket trading with significant gap.",
-                "source": "Market Watch",
-                "url": f"https://example.com/{symbol}",
-                "published_at": "2024-01-19T09:00:00Z",
-                "sentiment": 0.65,
-                "related_symbols": [symbol],
-            }
-        ]
+        news = await _fetch_news(symbol)
+        
+        # Unscored headlines are scored concurrently; the batcher sends them as one Groq call
+        unscored = [item for item in news if item.get("sentiment") is None]
+        if unscored:
+            scores = await asyncio.gather(*(analyze_sentiment(item["title"]) for item in unscored))
+            for item, score in zip(unscored, scores):
+                item["sentiment"] = score
+        
         return news
         
     except Exception as e:
@@ -88,6 +215,24 @@ async def get_news_sentiment(symbol: str) -> List[Dict]:
         return []
 
 
+async def _fetch_news(symbol: str) -> List[Dict]:
+    """Fetch news items for a symbol; sentiment is None where not yet scored"""
+    # Note: Alpaca news requires subscription
+    # For free tier, return mock data
+    return [
+        {
+            "id": "1",
+            "title": f"{symbol} Shows Strong Premarket Activity",
+            "summary": "Stock experiencing increased volatility in premarket trading with significant gap.",
+            "source": "Market Watch",
+            "url": f"https://example.com/{symbol}",
+            "published_at": "2024-01-19T09:00:00Z",
+            "sentiment": 0.65,
+            "related_symbols": [symbol],
+        }
+    ]
+
+
 async def get_gap_reason(symbol: str, gap_percent: float) -> Dict:
     """
     Use AI to explain why a gap occurred
@@ -99,47 +244,55 @@ async def get_gap_reason(symbol: str, gap_percent: float) -> Dict:
         }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.groq_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "mixtral-8x7b-32768",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a financial analyst. Explain stock gaps in 2-3 sentences. Be specific and actionable.",
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Why did {symbol} gap {gap_percent:.2f}% today? What are the likely catalysts?",
-                        },
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 150,
-                },
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                reason = result["choices"][0]["message"]["content"].strip()
-                
-                return {
-                    "reason": reason,
-                    "confidence": 0.75,
-                }
-            else:
-                return {
-                    "reason": f"Failed to analyze gap for {symbol}",
-                    "confidence": 0.0,
-                }
-                
+        key = ("gap_reason", symbol, round(gap_percent, 2))
+        reason = await _coalesced(key, lambda: _fetch_gap_reason(symbol, gap_percent))
+        if reason is None:
+            return {
+                "reason": f"Failed to analyze gap for {symbol}",
+                "confidence": 0.0,
+            }
+        return {
+            "reason": reason,
+            "confidence": 0.75,
+        }
+        
     except Exception as e:
         logger.error(f"Error getting gap reason: {e}")
         return {
             "reason": f"Error analyzing gap: {str(e)}",
             "confidence": 0.0,
         }
+
+
+async def _fetch_gap_reason(symbol: str, gap_percent: float) -> Optional[str]:
+    """Ask Groq to explain a gap; None if the API call fails"""
+    response = await _groq_post(
+        "/chat/completions",
+        headers={
+            "Authorization": f"Bearer {settings.groq_api_key}",
+            "Content-Type": "application/json",
+        },
+        json={
+            "model": "mixtral-8x7b-32768",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a financial analyst. Explain stock gaps in 2-3 sentences. Be specific and actionable.",
+                },
+                {
+                    "role": "user",
+                    "content": f"Why did {symbol} gap {gap_percent:.2f}% today? What are the likely catalysts?",
+                },
+            ],
+            "temperature": 0.7,
+            "max_tokens": 150,
+        },
+        timeout=15.0,
+    )
+    
+    if response.status_code != 200:
+        logger.error(f"Groq API error: {response.status_code}")
+        return None
+    
+    result = response.json()
+    return result["choices"][0]["message"]["content"].strip()
@@ -24,4 +24,5 @@ exec uvicorn main:app \
     --host "${HOST:-0.0.0.0}" \
     --port "${PORT:-8000}" \
     --workers "${WORKERS:-1}" \
+    --loop uvloop \
     --log-level "${LOG_LEVEL:-info}"
@@ -2,14 +2,37 @@
 from lumibot.strategies import Strategy
 from lumibot.brokers import Alpaca
 from lumibot.entities import Asset
+from alpaca.data.historical import StockHistoricalDataClient
+from alpaca.data.requests import StockBarsRequest, StockLatestTradeRequest, StockSnapshotRequest
+from alpaca.data.timeframe import TimeFrame
+from collections import deque
 from datetime import datetime, timedelta
 from config import settings
+from watchlists import LIQUID
 import logging
-from typing import Dict, List, Optional
-import pandas as pd
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Minute bars in the rolling volume average used for volume ratio
+VOLUME_WINDOW = 20
+
+# Lumibot's get_last_prices and get_historical_prices_for_assets loop over
+# assets one request at a time, while Alpaca's data API takes a symbol list,
+# so live scans call alpaca-py directly (raw dicts, no model objects)
+_stock_client = StockHistoricalDataClient(
+    api_key=settings.alpaca_api_key,
+    secret_key=settings.alpaca_secret_key,
+    raw_data=True,
+)
+
+
+def _by_symbol(mapping) -> Dict:
+    """Re-key a Lumibot {Asset: value} result by ticker symbol"""
+    return {getattr(asset, "symbol", asset): value for asset, value in (mapping or {}).items()}
+
 
 class GapTradingStrategy(Strategy):
     """
@@ -30,17 +53,33 @@ class GapTradingStrategy(Strategy):
         "risk_per_trade": 0.02,  # 2% portfolio risk
         "profit_target_ratio": 2.0,  # 2:1 reward:risk
         "max_positions": 3,
-        "scan_symbols": ["SPY", "QQQ", "AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "AMD"],
+        "scan_symbols": list(LIQUID),
     }
     
     def initialize(self):
         """Initialize strategy"""
-        self.sleeptime = "5M"  # Check every 5 minutes
+        self.sleeptime = "5M"  # Adjusted each iteration by _next_sleeptime
+        
+        # Bind parameters once instead of dict lookups on every iteration
+        p = self.parameters
+        self._gap_min = p["gap_min"]
+        self._gap_max = p["gap_max"]
+        self._volume_ratio_min = p["volume_ratio_min"]
+        self._risk_per_trade = p["risk_per_trade"]
+        self._profit_target_ratio = p["profit_target_ratio"]
+        self._max_positions = p["max_positions"]
+        self._scan_symbols = tuple(p["scan_symbols"])
         self.gap_candidates: Dict[str, Dict] = {}
-        self.positions_entered_today = []
+        self.positions_entered_today: Set[str] = set()
+        self._last_trading_date = None
+        self._prev_close_cache: Dict[str, float] = {}  # symbol -> previous close, for today
+        self._volume_windows: Dict[str, deque] = {}  # symbol -> (bar time, volume) minute bars
+        self._volume_sums: Dict[str, float] = {}  # symbol -> sum of volumes in its window
+        self._volume_updated_at: Optional[datetime] = None
         
         # Track for frontend API
         self.last_scan_results = []
+        self.last_scan_results_json = b"[]"  # Serialized once per scan for the API
         self.strategy_stats = {
             "total_trades": 0,
             "wins": 0,
@@ -55,137 +94,291 @@ class GapTradingStrategy(Strategy):
         try:
             current_time = self.get_datetime()
             
+            # New trading day: symbols traded yesterday may be entered again,
+            # and yesterday's closes and volume windows are stale
+            today = current_time.date()
+            if today != self._last_trading_date:
+                self.positions_entered_today.clear()
+                self._prev_close_cache.clear()
+                self._volume_windows.clear()
+                self._volume_sums.clear()
+                self._volume_updated_at = None
+                self._last_trading_date = today
+            
             # Only scan for gaps near market open (9:30 - 10:00 ET)
             if self._is_scan_time(current_time):
                 self._scan_for_gaps()
             
-            # Manage existing positions
-            self._manage_positions()
+            # Positions are read once; _manage_positions hands back what is
+            # still open after any exits for the entry and sleep steps
+            positions = self._manage_positions(self.get_positions())
             
             # Enter new positions if conditions met
-            self._check_entry_signals()
+            self._check_entry_signals(positions)
+            
+            self.sleeptime = self._next_sleeptime(current_time, positions)
             
         except Exception as e:
             logger.error(f"Error in trading iteration: {e}", exc_info=True)
     
+    def _next_sleeptime(self, dt: datetime, positions: List) -> str:
+        """
+        Poll every minute in the scan window, every 5 minutes while there are
+        candidates or positions to watch, and every 15 minutes otherwise
+        """
+        minutes = dt.hour * 60 + dt.minute
+        until_open = 9 * 60 + 30 - minutes
+        if until_open > 0:
+            # Wake up right at the open
+            return f"{min(15, until_open)}M"
+        if self._is_scan_time(dt):
+            return "1M"
+        if positions or self.gap_candidates:
+            return "5M"
+        return "15M"
+    
     def _is_scan_time(self, dt: datetime) -> bool:
-        """Check if current time is within gap scanning window"""
-        market_open = dt.replace(hour=9, minute=30, second=0, microsecond=0)
-        scan_end = dt.replace(hour=10, minute=0, second=0, microsecond=0)
-        return market_open <= dt <= scan_end
+        """Check if current time is within gap scanning window (9:30 - 10:00)"""
+        # Integer HHMM compare instead of building two datetimes per iteration;
+        # the window end is inclusive, so exactly 10:00:00 still counts
+        hhmm = dt.hour * 100 + dt.minute
+        return 930 <= hhmm < 1000 or (hhmm == 1000 and not dt.second and not dt.microsecond)
     
     def _scan_for_gaps(self):
         """Scan symbols for gap opportunities"""
         self.gap_candidates.clear()
         self.last_scan_results.clear()
+        self.last_scan_results_json = b"[]"
         
-        for symbol in self.parameters["scan_symbols"]:
-            try:
-                gap_data = self._analyze_gap(symbol)
-                if gap_data and self._is_valid_gap(gap_data):
-                    self.gap_candidates[symbol] = gap_data
-                    self.last_scan_results.append(gap_data)
-                    logger.info(f"Gap detected: {symbol} at {gap_data['gap_percent']:.2f}%")
-            except Exception as e:
-                logger.warning(f"Failed to analyze {symbol}: {e}")
+        try:
+            scan = self._analyze_gaps(self._scan_symbols)
+        except Exception as e:
+            logger.error(f"Error analyzing gaps: {e}")
+            return
+        
+        for gap_data in scan:
+            symbol = gap_data["symbol"]
+            self.gap_candidates[symbol] = gap_data
+            self.last_scan_results.append(gap_data)
+            logger.info(f"Gap detected: {symbol} at {gap_data['gap_percent']:.2f}%")
         
+        self.last_scan_results_json = orjson.dumps(self.last_scan_results)
         logger.info(f"Gap scan complete. Found {len(self.gap_candidates)} candidates")
     
-    def _analyze_gap(self, symbol: str) -> Optional[Dict]:
-        """Analyze single symbol for gap"""
-        try:
-            # Get current price
-            current_price = self.get_last_price(symbol)
-            if not current_price:
-                return None
-            
-            # Get previous close
-            bars = self.get_historical_prices(symbol, 2, "day")
-            if bars is None or bars.df.empty:
-                return None
+    def _analyze_gaps(self, symbols: List[str]) -> List[Dict]:
+        """
+        Analyze all symbols for gaps
+        Live, the whole watchlist costs one snapshot request and one minute-bar
+        request; backtests go through Lumibot's data source instead
+        Returns only gaps that meet the size and volume criteria
+        """
+        if self.is_backtesting:
+            # Lumibot's data source isn't documented as thread-safe, so its
+            # multi-asset helpers are called from the strategy thread only
+            assets = [Asset(symbol=symbol) for symbol in symbols]
+            last_prices = _by_symbol(self.get_last_prices(assets))
             
-            prev_close = bars.df["close"].iloc[-2]
-            gap_percent = ((current_price - prev_close) / prev_close) * 100
-            
-            # Get volume data
-            current_bars = self.get_historical_prices(symbol, 20, "minute")
-            if current_bars is None or current_bars.df.empty:
-                volume = 0
-                volume_ratio = 0
-            else:
-                volume = current_bars.df["volume"].iloc[-1]
-                avg_volume = current_bars.df["volume"].mean()
-                volume_ratio = volume / avg_volume if avg_volume > 0 else 0
-            
-            return {
+            # Previous close is fixed for the day; only fetch daily bars for new symbols
+            missing = [asset for asset in assets if asset.symbol not in self._prev_close_cache]
+            if missing:
+                daily_bars = _by_symbol(self.get_historical_prices_for_assets(missing, 2, "day"))
+                for symbol, bars in daily_bars.items():
+                    if bars is not None and len(bars.df) >= 2:
+                        self._prev_close_cache[symbol] = float(bars.df["close"].to_numpy()[-2])
+        else:
+            # One snapshot carries both the latest trade and yesterday's daily bar
+            last_prices, prev_closes = self._fetch_snapshots(symbols)
+            self._prev_close_cache.update(prev_closes)
+        self._update_volume_windows(symbols)
+        
+        # Need a current price and yesterday's close
+        syms = [s for s in symbols if last_prices.get(s) and s in self._prev_close_cache]
+        if not syms:
+            return []
+        
+        current_price = np.array([last_prices[s] for s in syms], dtype=np.float64)
+        prev_close = np.array([self._prev_close_cache[s] for s in syms], dtype=np.float64)
+        
+        # Latest minute volume vs the rolling average (0 when unavailable)
+        volume = np.zeros(len(syms), dtype=np.float64)
+        avg_volume = np.zeros(len(syms), dtype=np.float64)
+        for i, s in enumerate(syms):
+            window = self._volume_windows.get(s)
+            if window:
+                volume[i] = window[-1][1]
+                avg_volume[i] = self._volume_sums[s] / len(window)
+        
+        gap_percent = (current_price - prev_close) / prev_close * 100
+        volume_ratio = np.divide(volume, avg_volume, out=np.zeros_like(volume), where=avg_volume > 0)
+        
+        # Validate every symbol at once: gap size within range and enough volume
+        abs_gap = np.abs(gap_percent)
+        keep = np.flatnonzero(
+            (abs_gap >= self._gap_min)
+            & (abs_gap <= self._gap_max)
+            & (volume_ratio >= self._volume_ratio_min)
+        )
+        
+        timestamp = self.get_datetime()
+        return [
+            {
                 "symbol": symbol,
-                "current_price": current_price,
-                "previous_close": prev_close,
-                "gap_percent": gap_percent,
-                "volume": int(volume),
-                "volume_ratio": volume_ratio,
-                "timestamp": self.get_datetime(),
+                "current_price": price,
+                "previous_close": prev,
+                "gap_percent": gap,
+                "volume": int(vol),
+                "volume_ratio": ratio,
+                "timestamp": timestamp,
             }
+            for symbol, price, prev, gap, vol, ratio in zip(
+                [syms[i] for i in keep],
+                current_price[keep].tolist(),
+                prev_close[keep].tolist(),
+                gap_percent[keep].tolist(),
+                volume[keep].tolist(),
+                volume_ratio[keep].tolist(),
+            )
+        ]
+    
+    def _fetch_snapshots(self, symbols: List[str]) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Last trade price and previous close per symbol from one snapshot request"""
+        snapshots = _stock_client.get_stock_snapshot(
+            StockSnapshotRequest(symbol_or_symbols=list(symbols), feed="iex")
+        )
         
-        except Exception as e:
-            logger.error(f"Error analyzing gap for {symbol}: {e}")
-            return None
+        # Raw snapshots: {symbol: {"latestTrade", "prevDailyBar", ...}}
+        last_prices: Dict[str, float] = {}
+        prev_closes: Dict[str, float] = {}
+        for symbol, snap in (snapshots or {}).items():
+            if not snap:
+                continue
+            if snap.get("latestTrade"):
+                last_prices[symbol] = snap["latestTrade"]["p"]
+            if snap.get("prevDailyBar"):
+                prev_closes[symbol] = snap["prevDailyBar"]["c"]
+        return last_prices, prev_closes
     
-    def _is_valid_gap(self, gap_data: Dict) -> bool:
-        """Validate gap meets criteria"""
-        gap_pct = abs(gap_data["gap_percent"])
+    def _fetch_minute_volumes(self, symbols: List[str], length: int) -> Dict[str, List[tuple]]:
+        """(bar time, volume) pairs per symbol, oldest first, covering the last length minutes"""
+        if self.is_backtesting:
+            assets = [Asset(symbol=symbol) for symbol in symbols]
+            bars_by_symbol = _by_symbol(self.get_historical_prices_for_assets(assets, length, "minute"))
+            return {
+                symbol: list(zip(bars.df.index, bars.df["volume"].to_numpy().tolist()))
+                for symbol, bars in bars_by_symbol.items()
+                if bars is not None and not bars.df.empty
+            }
         
-        # Check gap size
-        if gap_pct < self.parameters["gap_min"] or gap_pct > self.parameters["gap_max"]:
-            return False
+        bars = _stock_client.get_stock_bars(
+            StockBarsRequest(
+                symbol_or_symbols=list(symbols),
+                timeframe=TimeFrame.Minute,
+                start=self.get_datetime() - timedelta(minutes=length),
+                feed="iex",
+            )
+        )
+        
+        # Raw bars: {symbol: [{"t", "v", ...}]}; ISO "t" strings sort chronologically
+        return {symbol: [(bar["t"], bar["v"]) for bar in rows] for symbol, rows in (bars or {}).items() if rows}
+    
+    def _update_volume_windows(self, symbols: List[str]):
+        """
+        Fold new minute bars into each symbol's rolling volume window and sum
+        Once filled, only the minutes since the last update are fetched
+        """
+        now = self.get_datetime()
+        if self._volume_updated_at is None or any(s not in self._volume_windows for s in symbols):
+            length = VOLUME_WINDOW
+        else:
+            # +1 re-reads the newest bar we have, which may have been partial
+            elapsed = int((now - self._volume_updated_at).total_seconds() // 60)
+            length = max(1, min(VOLUME_WINDOW, elapsed + 1))
         
-        # Check volume
-        if gap_data["volume_ratio"] < self.parameters["volume_ratio_min"]:
-            return False
+        for symbol, bars in self._fetch_minute_volumes(symbols, length).items():
+            window = self._volume_windows.setdefault(symbol, deque())
+            total = self._volume_sums.get(symbol, 0.0)
+            for ts, vol in bars:
+                if window and ts < window[-1][0]:
+                    continue
+                if window and ts == window[-1][0]:
+                    total -= window.pop()[1]
+                window.append((ts, vol))
+                total += vol
+                if len(window) > VOLUME_WINDOW:
+                    total -= window.popleft()[1]
+            self._volume_sums[symbol] = total
         
-        return True
+        self._volume_updated_at = now
     
-    def _check_entry_signals(self):
+    def _check_entry_signals(self, positions: List):
         """Check for entry signals on gap candidates"""
-        current_positions = len(self.get_positions())
+        current_positions = len(positions)
         
-        if current_positions >= self.parameters["max_positions"]:
+        if current_positions >= self._max_positions:
             return
         
-        for symbol, gap_data in list(self.gap_candidates.items()):
-            if symbol in self.positions_entered_today:
-                continue
+        pending = [s for s in self.gap_candidates if s not in self.positions_entered_today]
+        if not pending:
+            return
+        last_prices = self._batch_last_prices(pending)
+        
+        for symbol in pending:
+            gap_data = self.gap_candidates[symbol]
             
             # Check if price is filling the gap
-            current_price = self.get_last_price(symbol)
+            current_price = last_prices.get(symbol)
+            if not current_price:
+                continue
             gap_pct = gap_data["gap_percent"]
             
             # Entry condition: price moving towards previous close
             if gap_pct > 0:  # Gap up
                 # Enter short if price starts declining
                 if current_price < gap_data["current_price"] * 0.98:
-                    self._enter_position(symbol, "short", gap_data)
+                    self._enter_short(symbol, gap_data, current_price)
             else:  # Gap down
                 # Enter long if price starts rising
                 if current_price > gap_data["current_price"] * 1.02:
-                    self._enter_position(symbol, "long", gap_data)
+                    self._enter_long(symbol, gap_data, current_price)
     
-    def _enter_position(self, symbol: str, direction: str, gap_data: Dict):
-        """Enter a position with proper risk management"""
+    def _batch_last_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Last trade prices for several symbols; one request when live"""
+        if self.is_backtesting:
+            return _by_symbol(self.get_last_prices([Asset(symbol=symbol) for symbol in symbols]))
+        
+        # Raw latest trades: {symbol: {"p", "s", "t", ...}}
+        trades = _stock_client.get_stock_latest_trade(
+            StockLatestTradeRequest(symbol_or_symbols=list(symbols), feed="iex")
+        )
+        return {symbol: trade["p"] for symbol, trade in (trades or {}).items() if trade}
+    
+    def _enter_long(self, symbol: str, gap_data: Dict, current_price: float):
+        """Enter a long position with the stop at the gap start point"""
+        stop_loss = gap_data["current_price"]
+        target = current_price + (current_price - stop_loss) * self._profit_target_ratio
+        self._submit_entry(symbol, "long", "buy", current_price, stop_loss, target)
+    
+    def _enter_short(self, symbol: str, gap_data: Dict, current_price: float):
+        """Enter a short position with the stop at the gap start point"""
+        stop_loss = gap_data["current_price"]
+        target = current_price - (stop_loss - current_price) * self._profit_target_ratio
+        self._submit_entry(symbol, "short", "sell", current_price, stop_loss, target)
+    
+    def _submit_entry(
+        self,
+        symbol: str,
+        direction: str,
+        side: str,
+        current_price: float,
+        stop_loss: float,
+        target: float,
+    ):
+        """Size a position from portfolio risk and submit the entry order"""
         try:
-            current_price = self.get_last_price(symbol)
             portfolio_value = self.get_portfolio_value()
             
             # Calculate position size based on risk
-            risk_amount = portfolio_value * self.parameters["risk_per_trade"]
-            
-            # Calculate stop loss (gap start point)
-            if direction == "long":
-                stop_loss = gap_data["current_price"]
-                target = current_price + (current_price - stop_loss) * self.parameters["profit_target_ratio"]
-            else:  # short
-                stop_loss = gap_data["current_price"]
-                target = current_price - (stop_loss - current_price) * self.parameters["profit_target_ratio"]
+            risk_amount = portfolio_value * self._risk_per_trade
             
             # Calculate shares based on stop distance
             stop_distance = abs(current_price - stop_loss)
@@ -197,12 +390,11 @@ class GapTradingStrategy(Strategy):
                 return
             
             # Create order
-            order_side = "buy" if direction == "long" else "sell"
-            order = self.create_order(symbol, shares, order_side)
+            order = self.create_order(symbol, shares, side)
             self.submit_order(order)
             
             # Track entry
-            self.positions_entered_today.append(symbol)
+            self.positions_entered_today.add(symbol)
             self.strategy_stats["total_trades"] += 1
             
             logger.info(f"Entered {direction} position: {symbol} @ {current_price}, Stop: {stop_loss}, Target: {target}")
@@ -210,14 +402,11 @@ class GapTradingStrategy(Strategy):
         except Exception as e:
             logger.error(f"Failed to enter position for {symbol}: {e}")
     
-    def _manage_positions(self):
-        """Manage open positions with stops and targets"""
-        positions = self.get_positions()
-        
+    def _manage_positions(self, positions: List) -> List:
+        """Manage open positions with stops and targets; returns those still open"""
         for position in positions:
             try:
                 symbol = position.symbol
-                current_price = self.get_last_price(symbol)
                 
                 # Simple exit: close at end of day
                 current_time = self.get_datetime()
@@ -226,9 +415,12 @@ class GapTradingStrategy(Strategy):
                 if current_time >= market_close:
                     self.sell_all()
                     logger.info(f"Closed {symbol} at end of day")
+                    # sell_all closed everything; re-read in case an order didn't fill
+                    return self.get_positions()
                     
             except Exception as e:
                 logger.error(f"Error managing position {symbol}: {e}")
+        return positions
     
     def on_abrupt_closing(self):
         """Handle strategy shutdown"""
@@ -0,0 +1,11 @@
+"""Symbol watchlists shared by the data service and the strategy"""
+
+# Most active stocks scanned for gaps by the API
+SCAN = (
+    "SPY", "QQQ", "IWM", "DIA",  # ETFs
+    "AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "AMD",  # Mega caps
+    "NFLX", "BABA", "COIN", "PLTR", "SOFI", "MARA", "RIOT",  # High volatility
+)
+
+# Highly liquid subset traded by the Lumibot strategy by default
+LIQUID = ("SPY", "QQQ", "AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "AMD")